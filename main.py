@@ -8,6 +8,8 @@ You will need two csv files to run this program:
 You will need to import modules in the terminal using the requirements.txt file such as:
     pip install -r requirements.txt
 
+The school of each student is cached in the .sga_cache directory and rebuilt automatically whenever the student data changes.
+
 You can adjust the variables in the config.ini file to match the election. The school should be either "ses", "sob", "sse", or "hass".
 
 Author: Rocco Vaccone
@@ -17,17 +19,58 @@ Updated: 10/7/2023
 
 # Module imports
 import pandas as pd
+import numpy as np
 from tqdm import tqdm
-from collections import defaultdict
+from collections import Counter
 import configparser
 import sys
 import logging
+import logging.handlers
+import queue
 from datetime import date
 import os
+import hashlib
+import json
+import tempfile
+import contextlib
+import re
+
+# Optional module imports
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
 
 # File imports
 from dict import school_majors
 
+# Map each major to its school, keeping the first school listed for majors shared between schools
+MAJOR_TO_SCHOOL = {
+    major.lower(): school
+    for school, majors in reversed(school_majors.items())
+    for major in majors
+}
+
+# Store the csv columns as arrow backed strings when pyarrow is available
+STRING_DTYPE = pd.StringDtype("python" if pyarrow is None else "pyarrow")
+
+# Number of votes read from the voting csv file at a time
+CHUNK_SIZE = 100_000
+
+# Directory where the school of each student is cached between runs
+CACHE_DIR = ".sga_cache"
+
+# Name of the cache files, so only caches written by this program are ever removed from the cache directory
+CACHE_PREFIX = "cwid_to_school-"
+CACHE_FILE_PATTERN = re.compile(rf"{re.escape(CACHE_PREFIX)}[0-9a-f]{{40}}\.json")
+
+# Version of the cached data, bumped whenever the way it is built changes so older caches are rebuilt
+CACHE_VERSION = 1
+
+# Line separating the entries of the log file
+LOG_SEPARATOR = "-" * 100
+
 
 # Retrieve the values from the config.ini file
 def load_config():
@@ -45,23 +88,24 @@ def load_config():
 
 
 # Identify one csv file in the directory
-def find_csv_file(excluded_files=["data"]):
+def find_csv_file(excluded_files=frozenset({"data"})):
     """
     Identifies one csv file in the directory and returns the name of the file.
 
     Args:
-    excluded_files (list): A list of file names that should be excluded from the search.
+    excluded_files (set): A set of file names that should be excluded from the search.
 
     Returns:
     file (str): The name of the csv file.
     """
-    files = [
-        file
-        for file in os.listdir()
-        if os.path.isfile(file)
-        and file.endswith(".csv")
-        and file.replace(".csv", "") not in excluded_files
-    ]
+    with os.scandir() as entries:
+        files = [
+            entry.name
+            for entry in entries
+            if entry.name.endswith(".csv")
+            and entry.name[: -len(".csv")] not in excluded_files
+            and entry.is_file()
+        ]
     if not files:
         raise FileNotFoundError("CSV file not found")
     if len(files) != 1:
@@ -69,262 +113,431 @@ def find_csv_file(excluded_files=["data"]):
     return files[0]
 
 
-# Load the data from the csv files
-def load_data(data_file, voting_file):
+# Map each candidate column to the school of its nominees
+def nominee_columns(candidate_column_name):
     """
-    Loads the data from the csv files and returns them as DataFrames.
+    Maps each candidate column of the voting responses to the school of its nominees.
 
     Args:
-    data_file (str): The name of the csv file with the student data.
-    voting_file (str): The name of the csv file with the voting responses.
+    candidate_column_name (str): The name of the column with the nominees.
 
     Returns:
-    data_df (DataFrame): A DataFrame with the student data.
-    votes_df (DataFrame): A DataFrame with the voting responses.
+    columns (dict): A dictionary where each key-value pair is a candidate column and the school of its nominees.
     """
-    try:
-        data_df = pd.read_csv(data_file)
-        votes_df = pd.read_csv(voting_file)
-    except FileNotFoundError as e:
-        print(e)
-        sys.exit(e.errno)
-    return data_df, votes_df
-
+    return {
+        candidate_column_name: "ses",
+        candidate_column_name + ".1": "sob",
+        candidate_column_name + ".2": "sse",
+        candidate_column_name + ".3": "hass",
+    }
 
-# Create the logger
-def setup_logger():
-    """
-    Sets up the logger to log warnings and errors to a file.
 
-    Returns:
-    None
+# Parse the needed columns of a csv file as strings
+def parse_csv(file, columns, multithreaded=False):
     """
-    today = date.today().strftime("%m-%d-%Y")
-    logging.basicConfig(
-        level=logging.INFO,
-        filename=f"InvalidAndDuplicateVotes_{today}.log",
-        filemode="w",
-        format="%(asctime)s - %(levelname)s - %(message)s\n",
-    )
-
+    Parses the needed columns of a csv file as strings.
 
-# Initialize the votes, voting record, and voter CWIDs
-def initialize_setups():
-    """
-    Initializes the votes, voting record, and voter CWIDs.
+    Args:
+    file (str): The name of the csv file.
+    columns (list): The names of the columns to read.
+    multithreaded (bool): Whether to parse the csv file with the pyarrow csv reader.
 
     Returns:
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
-    voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
-    voter_cwids (set): A set of CWIDs of the voters.
-    """
-    votes = {}
-    voting_record = {
-        "valid": 0,
-        "invalid": 0,
-        "wrong_school": 0,
-        "duplicate": 0,
-    }
-    voter_cwids = set()
-    return votes, voting_record, voter_cwids
+    df (DataFrame): A DataFrame with the needed columns of the csv file.
+    """
+    # The pyarrow reader does not rename duplicate column names the way pandas does, so it is only used when asked
+    if multithreaded and pyarrow is not None:
+        options = pyarrow.csv.ConvertOptions(
+            include_columns=columns,
+            column_types=dict.fromkeys(columns, pyarrow.string()),
+            strings_can_be_null=True,
+        )
+        # Quoted values such as notes may span several lines, which pyarrow has to be told to expect
+        table = pyarrow.csv.read_csv(
+            file,
+            parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+            convert_options=options,
+        )
+        return table.to_pandas(types_mapper={pyarrow.string(): STRING_DTYPE}.get)
+    return pd.read_csv(file, usecols=columns, dtype=STRING_DTYPE)
 
 
-# Add votes from a list to the votes dictionary
-def add_votes(candidate_list, votes, voting_record):
+# Normalize a column of CWIDs so the same CWID is always written the same way
+def normalize_cwids(cwids):
     """
-    Adds votes from a list to the votes dictionary.
+    Normalizes a column of CWIDs so the same CWID is always written the same way.
 
     Args:
-    candidate_list (list): A list of candidates.
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
-    voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
+    cwids (Series): A Series of CWIDs read as strings.
 
     Returns:
-    None
+    cwids (Series): A Series of the normalized CWIDs as strings.
     """
-    for candidate in candidate_list:
-        voting_record["valid"] += 1
-        if candidate not in votes.keys():
-            votes[candidate] = 1
-        else:
-            votes[candidate] += 1
+    # Surrounding spaces, leading zeros and a trailing '.0' are dropped, and anything but digits becomes missing
+    digits = cwids.str.extract(r"^\s*(\d+)(?:\.0+)?\s*$", expand=False)
+    return digits.str.lstrip("0").replace("", "0")
 
 
 # Determine the school of a major
-def school_by_major(major, data_dict):
+def school_by_major(major):
     """
-    Determines the school of a major using a dictionary of schools and majors.
+    Determines the school of a major.
 
     Args:
     major (str): The major to find the school of.
-    data_dict (dict): A dictionary where each key-value pair is a school and a list of majors.
 
     Returns:
     school (str): The school of the major.
     """
-    if major is None:
-        return None
-    major = major.lower()
-    for school, majors in data_dict.items():
-        if major in majors:
-            return school
-    return None
+    return MAJOR_TO_SCHOOL.get(major.lower())
 
 
-# Determine the school of a student by their CWID
-def school_by_cwid(cwid, data_df):
+# Map the CWID of each student to their school
+def map_cwid_to_school(data_df):
     """
-    Determines the school of a student by their CWID.
+    Maps the CWID of each student to their school so voters can be looked up directly.
 
     Args:
-    cwid (str): The CWID of the student.
     data_df (DataFrame): A DataFrame with the student data.
 
     Returns:
-    school (str): The school of the student.
+    cwid_to_school (dict): A dictionary where each key-value pair is a CWID and the school of the student.
+    """
+    # Students without a CWID can never be matched to a vote, so they are left out
+    students = data_df.dropna(subset=["CWID"]).drop_duplicates(subset="CWID")
+    # The majors are categorical, so each distinct major is only mapped to its school once
+    schools = students["Major"].map(school_by_major)
+    # Blank majors come back as missing values, which are stored as None like unknown majors
+    return {
+        cwid: school if isinstance(school, str) else None
+        for cwid, school in zip(students["CWID"], schools)
+    }
+
+
+# Load the school of each student, using a cached copy while the student data is unchanged
+def load_cwid_to_school(data_file):
     """
-    subset = data_df.loc[data_df["CWID"] == cwid, "Major"]
-    if not subset.empty:
-        major = subset.iloc[0].lower()
-    else:
-        major = None
-    return school_by_major(major, school_majors)
+    Loads the school of each student from the student data, or from the cache while the student data is unchanged.
+
+    Args:
+    data_file (str): The name of the csv file with the student data.
+
+    Returns:
+    cwid_to_school (dict): A dictionary where each key-value pair is a CWID and the school of the student.
+    """
+    # The cache is keyed by the location, modification time and size of the csv file, the majors of each school and
+    # the cache version, so it is rebuilt when any of them change
+    key = hashlib.sha1(
+        f"{os.path.abspath(data_file)}:{os.path.getmtime(data_file)}:{os.path.getsize(data_file)}:"
+        f"{sorted(MAJOR_TO_SCHOOL.items())}:{CACHE_VERSION}".encode()
+    ).hexdigest()
+    cache_file = os.path.join(CACHE_DIR, f"{CACHE_PREFIX}{key}.json")
+    try:
+        with open(cache_file, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        pass
+
+    data_df = parse_csv(data_file, ["CWID", "Major"], multithreaded=True)
+    data_df["CWID"] = normalize_cwids(data_df["CWID"])
+    data_df["Major"] = data_df["Major"].astype("category")
+    cwid_to_school = map_cwid_to_school(data_df)
+
+    # Write to a temporary file first so an interrupted run never leaves a partial cache behind
+    temp_file = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=CACHE_DIR,
+            prefix=CACHE_PREFIX,
+            suffix=".tmp",
+            delete=False,
+        ) as file:
+            temp_file = file.name
+            json.dump(cwid_to_school, file)
+        os.replace(temp_file, cache_file)
+        temp_file = None
+    except OSError:
+        return cwid_to_school
+    finally:
+        if temp_file is not None:
+            with contextlib.suppress(OSError):
+                os.remove(temp_file)
+
+    # Only the cache of the current student data is kept, so older copies of it do not pile up. Temporary files are
+    # left alone, since another run may still be writing one, and each run removes its own
+    with contextlib.suppress(OSError), os.scandir(CACHE_DIR) as entries:
+        for entry in entries:
+            if CACHE_FILE_PATTERN.fullmatch(entry.name) and entry.path != cache_file:
+                with contextlib.suppress(OSError):
+                    os.remove(entry.path)
+    return cwid_to_school
 
 
-# Determine the school of the nominees a student voted for
-def get_nominees_school(row, candidate_column_name):
+# Load the data from the csv files
+def load_data(data_file, voting_file, candidate_column_name):
     """
-    Determines the school of the nominees a student voted for.
+    Loads the data from the csv files.
 
     Args:
-    row (Series): A row from the votes DataFrame.
+    data_file (str): The name of the csv file with the student data.
+    voting_file (str): The name of the csv file with the voting responses.
     candidate_column_name (str): The name of the column with the nominees.
 
     Returns:
-    school (str): The school of the nominees.
-    candidates (list): A list of the candidates.
+    cwid_to_school (dict): A dictionary where each key-value pair is a CWID and the school of the student.
+    votes_chunks (TextFileReader): An iterator of DataFrames with the voting responses.
     """
-    schools = {
-        candidate_column_name: "ses",
-        candidate_column_name + ".1": "sob",
-        candidate_column_name + ".2": "sse",
-        candidate_column_name + ".3": "hass",
-    }
-    for column, school in schools.items():
-        candidates = row[column]
-        if isinstance(candidates, str):
-            return school, candidates
-    return None, None
+    try:
+        cwid_to_school = load_cwid_to_school(data_file)
+        # The candidate columns share one header, which only the pandas reader renames apart. The votes are streamed
+        # in chunks so only one chunk of votes is held in memory at a time
+        votes_chunks = pd.read_csv(
+            voting_file,
+            usecols=["Campus Wide ID (CWID)", *nominee_columns(candidate_column_name)],
+            dtype=STRING_DTYPE,
+            chunksize=CHUNK_SIZE,
+        )
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(e.errno)
+    return cwid_to_school, votes_chunks
+
+
+# Create the logger
+def setup_logger():
+    """
+    Sets up the logger to log warnings and errors to a file.
+
+    Returns:
+    listener (QueueListener): The listener writing the records to the file, which should be stopped when done.
+    """
+    today = date.today().strftime("%m-%d-%Y")
+    file_handler = logging.FileHandler(
+        f"InvalidAndDuplicateVotes_{today}.log", mode="w"
+    )
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s\n")
+    )
+    # Records are handed to a queue and written to the file by a background listener, so logging a vote does not
+    # wait on the disk
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    return listener
 
 
-# Verify a vote and add it to the votes dictionary
-def verify_vote(
-    row, votes, voting_record, voter_cwids, data_df, school, candidate_column_name
-):
+# Stop the logger
+def stop_logger(listener):
     """
-    Verifies a vote and adds it to the votes dictionary.
+    Stops the logger and closes the file it writes to.
 
     Args:
-    row (Series): A row from the votes DataFrame.
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
-    voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
-    voter_cwids (set): A set of CWIDs of the voters.
-    data_df (DataFrame): A DataFrame with the student data.
-    school (str): The school of the election.
-    candidate_column_name (str): The name of the column with the nominees.
+    listener (QueueListener): The listener returned by setup_logger.
 
     Returns:
     None
     """
-    voter_school = school_by_cwid(row["Campus Wide ID (CWID)"], data_df)
-    nominee_school, candidate_list = get_nominees_school(row, candidate_column_name)
-
-    if candidate_list is None or nominee_school is None:
-        logging.warning(f"Invalid vote: {row}\n{'-'*100}")
-        voting_record["invalid"] += 1
-        return
-    elif nominee_school != school or voter_school != school:
-        voting_record["wrong_school"] += 1
-        return
-    elif str(row["Campus Wide ID (CWID)"]) in voter_cwids:
-        logging.warning(f"Duplicate vote: {row}\n{'-'*100}")
-        voting_record["duplicate"] += 1
-        return
-    else:
-        voter_cwids.add(str(row["Campus Wide ID (CWID)"]))
-        candidate_list = candidate_list.split(", ")
-        add_votes(candidate_list, votes, voting_record)
-
-
-# Iterate through the votes DataFrame and verify each vote
-def iterate_votes(
-    votes, voting_record, voter_cwids, data_df, votes_df, school, candidate_column_name
-):
-    """
-    Iterates through the votes DataFrame and verifies each vote.
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    # The queue is detached from the root logger so later records are not handed to a queue that nobody reads
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        if (
+            isinstance(handler, logging.handlers.QueueHandler)
+            and handler.queue is listener.queue
+        ):
+            logger.removeHandler(handler)
+            handler.close()
 
-    Args:
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
+
+# Initialize the votes, voting record, and voter CWIDs
+def initialize_setups():
+    """
+    Initializes the votes, voting record, and voter CWIDs.
+
+    Returns:
+    votes (Counter): A counter where each key-value pair is a candidate and the number of votes they received.
     voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
     voter_cwids (set): A set of CWIDs of the voters.
-    data_df (DataFrame): A DataFrame with the student data.
-    votes_df (DataFrame): A DataFrame with the voting responses.
-    school (str): The school of the election.
-    candidate_column_name (str): The name of the column with the nominees.
+    """
+    votes = Counter()
+    voting_record = {
+        "valid": 0,
+        "invalid": 0,
+        "wrong_school": 0,
+        "duplicate": 0,
+    }
+    voter_cwids = set()
+    return votes, voting_record, voter_cwids
+
+
+# Determine the school of each voter by their CWID
+def school_by_cwid(cwids, cwid_to_school):
+    """
+    Determines the school of each voter by their CWID.
+
+    Args:
+    cwids (Series): The CWIDs of the voters.
+    cwid_to_school (dict): A dictionary where each key-value pair is a CWID and the school of the student.
 
     Returns:
-    None
+    schools (Series): The school of each voter, aligned with the CWIDs.
     """
-    for index, row in tqdm(votes_df.iterrows(), total=votes_df.shape[0]):
-        verify_vote(
-            row,
-            votes,
-            voting_record,
-            voter_cwids,
-            data_df,
-            school,
-            candidate_column_name,
-        )
+    return cwids.map(cwid_to_school)
 
 
-# Sort the votes dictionary by the number of votes
-def sort_votes(votes):
+# Determine the school of the nominees each student voted for
+def get_nominees_school(votes_df, columns, column_schools):
     """
-    Sorts the votes dictionary by the number of votes.
+    Determines the school of the nominees each student voted for.
 
     Args:
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
+    votes_df (DataFrame): A DataFrame with the voting responses.
+    columns (list): The names of the candidate columns.
+    column_schools (ndarray): The school of the nominees in each candidate column.
 
     Returns:
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received sorted by the number of votes.
+    schools (Series): The school of the nominees for each vote.
+    candidates (Series): The candidates of each vote as a comma separated string.
+    """
+    values = votes_df[columns].to_numpy(dtype=object)
+    present = ~pd.isna(values)
+
+    # Take the first candidate column each vote filled in, if any
+    first = present.argmax(axis=1)
+    rows = np.arange(len(values))
+    voted = present[rows, first]
+    nominee_school = np.where(voted, column_schools[first], None)
+    candidates = np.where(voted, values[rows, first], None)
+    return (
+        pd.Series(nominee_school, index=votes_df.index),
+        pd.Series(candidates, index=votes_df.index),
+    )
+
+
+# Create the function that verifies the votes of the election
+def make_verifier(school, candidate_column_name, cwid_to_school):
     """
-    return dict(sorted(votes.items(), key=lambda item: item[1], reverse=True))
+    Creates the function that verifies the votes of the election.
+
+    Args:
+    school (str): The school of the election.
+    candidate_column_name (str): The name of the column with the nominees.
+    cwid_to_school (dict): A dictionary where each key-value pair is a CWID and the school of the student.
 
+    Returns:
+    verify (function): A function that verifies a DataFrame of votes and adds the valid ones to the votes counter.
+    """
+    # The candidate columns and their schools are worked out once here rather than for every chunk
+    schools = nominee_columns(candidate_column_name)
+    columns = list(schools.keys())
+    column_schools = np.array(list(schools.values()), dtype=object)
+
+    # Classify the votes in a votes DataFrame and count the valid ones
+    def verify(votes_df, votes, voting_record, voter_cwids):
+        """
+        Classifies every vote in a votes DataFrame at once and adds the valid votes to the votes counter.
+
+        Args:
+        votes_df (DataFrame): A DataFrame with the voting responses.
+        votes (Counter): A counter where each key-value pair is a candidate and the number of votes they received.
+        voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
+        voter_cwids (set): A set of CWIDs of the voters whose vote was counted in earlier DataFrames.
+
+        Returns:
+        None
+        """
+        # The CWIDs are normalized once per chunk, so they are looked up and stored as they are
+        cwids = normalize_cwids(votes_df["Campus Wide ID (CWID)"])
+        voter_school = school_by_cwid(cwids, cwid_to_school)
+        nominee_school, candidates = get_nominees_school(
+            votes_df, columns, column_schools
+        )
 
-# Group the votes dictionary by the number of votes
-def group_votes_by_num(votes):
+        # The checks are applied in order, so a vote only counts against the first one it fails
+        invalid = candidates.isna() | nominee_school.isna()
+        wrong_school = ~invalid & (
+            cwids.isna() | (nominee_school != school) | (voter_school != school)
+        )
+        eligible = ~invalid & ~wrong_school
+        eligible_cwids = cwids[eligible]
+        duplicate = (
+            eligible_cwids.duplicated(keep="first") | eligible_cwids.isin(voter_cwids)
+        ).reindex(votes_df.index, fill_value=False)
+        valid = eligible & ~duplicate
+
+        # The rejected votes are only turned into records when warnings are actually logged
+        rejected = invalid | duplicate
+        if logging.getLogger().isEnabledFor(logging.WARNING):
+            # Only some columns are read, so the row is what points back to the ballot. The index counts data rows
+            # from 0 across chunks, so the header and the 1-based numbering of a spreadsheet add 2
+            for row, is_invalid, vote in zip(
+                votes_df.index[rejected],
+                invalid[rejected],
+                votes_df[rejected].to_dict(orient="records"),
+            ):
+                logging.warning(
+                    "%s vote (spreadsheet row %d): %s\n%s",
+                    "Invalid" if is_invalid else "Duplicate",
+                    row + 2,
+                    vote,
+                    LOG_SEPARATOR,
+                )
+
+        voting_record["invalid"] += int(invalid.sum())
+        voting_record["wrong_school"] += int(wrong_school.sum())
+        voting_record["duplicate"] += int(duplicate.sum())
+        voter_cwids.update(eligible_cwids[~duplicate[eligible]])
+
+        # Count in order of first appearance so ties keep the order the votes came in
+        counts = (
+            candidates[valid]
+            .str.split(", ", regex=False)
+            .explode()
+            .value_counts(sort=False)
+        )
+        votes.update(counts.to_dict())
+        voting_record["valid"] += int(counts.sum())
+
+    return verify
+
+
+# Iterate through the chunks of votes and verify each one
+def iterate_votes(verify, votes, voting_record, voter_cwids, votes_chunks):
     """
-    Groups the votes dictionary by the number of votes.
+    Iterates through the chunks of votes and verifies each one.
 
     Args:
-    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
+    verify (function): The function that verifies a DataFrame of votes, as created by make_verifier.
+    votes (Counter): A counter where each key-value pair is a candidate and the number of votes they received.
+    voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
+    voter_cwids (set): A set of CWIDs of the voters.
+    votes_chunks (iterable): An iterable of DataFrames with the voting responses.
 
     Returns:
-    votes_by_num (dict): A dictionary where each key-value pair is the number of votes and a list of the candidates that received that number of votes.
+    None
     """
-    votes_by_num = defaultdict(list)
-    for key, value in votes.items():
-        votes_by_num[value].append(key)
-    return votes_by_num
+    # The progress bar is updated once per chunk, and only the voter CWIDs are carried between chunks
+    with tqdm(unit=" votes") as progress_bar:
+        for votes_df in votes_chunks:
+            verify(votes_df, votes, voting_record, voter_cwids)
+            progress_bar.update(len(votes_df))
 
 
 # Determine the elected candidates and if there are any tied candidates
-def determine_elected(votes_by_num, num_seats):
+def determine_elected(votes, num_seats):
     """
     Determines the elected candidates and if there are any tied candidates.
 
     Args:
-    votes_by_num (dict): A dictionary where each key-value pair is the number of votes and a list of the candidates that received that number of votes.
+    votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
     num_seats (int): The number of seats in the election.
 
     Returns:
@@ -332,21 +545,25 @@ def determine_elected(votes_by_num, num_seats):
     remaining (int): The number of remaining seats.
     tied_elected (list): A list of the tied candidates.
     """
-    elected, remaining, tied_elected = [], None, None
-    for key, value in sorted(votes_by_num.items(), reverse=True):
-        if len(value) <= num_seats - len(elected):
-            elected.extend(value)
-        else:
-            remaining = num_seats - len(elected)
-            tied_elected = value
-            break
-    return elected, remaining, tied_elected
+    candidates = list(votes.keys())
+    counts = np.fromiter(votes.values(), dtype=np.int64, count=len(votes))
+    if len(counts) <= num_seats:
+        order = np.argsort(-counts, kind="stable")
+        return [candidates[i] for i in order], None, None
+
+    # The vote count just past the last seat is found with a partial sort, and only the candidates above it are
+    # sorted, since the rest can not change the result. Candidates with the same number of votes keep the order they
+    # first received a vote in
+    cutoff = counts[np.argpartition(-counts, num_seats)[num_seats]]
+    above = np.flatnonzero(counts > cutoff)
+    above = above[np.argsort(-counts[above], kind="stable")]
+    elected = [candidates[i] for i in above]
+    tied_elected = [candidates[i] for i in np.flatnonzero(counts == cutoff)]
+    return elected, num_seats - len(elected), tied_elected
 
 
 # Display the results of the election
-def print_output(
-    num_seats, votes, voting_record, voter_cwids, elected, remaining, tied_elected
-):
+def print_output(num_seats, votes, voting_record, elected, remaining, tied_elected):
     """
     Displays the results of the election.
 
@@ -354,7 +571,6 @@ def print_output(
     num_seats (int): The number of seats in the election.
     votes (dict): A dictionary where each key-value pair is a candidate and the number of votes they received.
     voting_record (dict): A dictionary where each key-value pair is a type of vote and the number of votes of that type.
-    voter_cwids (set): A set of CWIDs of the voters.
     elected (list): A list of the elected candidates.
     remaining (int): The number of remaining seats.
     tied_elected (list): A list of the tied candidates.
@@ -393,32 +609,27 @@ def main():
 
     voting_file = find_csv_file()
     print(f"\nIdentified the voting csv file as '{voting_file}'")
-    data_df, votes_df = load_data(config["data_file"], voting_file)
+    cwid_to_school, votes_chunks = load_data(
+        config["data_file"], voting_file, config["candidate_column_name"]
+    )
 
-    setup_logger()
+    log_listener = setup_logger()
 
     votes, voting_record, voter_cwids = initialize_setups()
-
-    iterate_votes(
-        votes,
-        voting_record,
-        voter_cwids,
-        data_df,
-        votes_df,
-        config["school"],
-        config["candidate_column_name"],
-    )
-    votes = sort_votes(votes)
-    votes_by_num = group_votes_by_num(votes)
-    elected, remaining, tied_elected = determine_elected(
-        votes_by_num, config["num_seats"]
+    verify = make_verifier(
+        config["school"], config["candidate_column_name"], cwid_to_school
     )
 
+    try:
+        iterate_votes(verify, votes, voting_record, voter_cwids, votes_chunks)
+    finally:
+        stop_logger(log_listener)
+    elected, remaining, tied_elected = determine_elected(votes, config["num_seats"])
+
     print_output(
         config["num_seats"],
         votes,
         voting_record,
-        voter_cwids,
         elected,
         remaining,
         tied_elected,